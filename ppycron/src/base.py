@@ -5,6 +5,8 @@ from typing import List, Optional
 
 @dataclasses.dataclass
 class Cron:
+    __slots__ = ("command", "interval")
+
     command: str
     interval: str
 
@@ -22,6 +24,12 @@ class BaseInterface(metaclass=abc.ABCMeta):
     def add(self, command, interval) -> Cron:
         raise NotImplementedError
 
+    def bulk(self):
+        raise NotImplementedError
+
+    def exists(self, command) -> bool:
+        raise NotImplementedError
+
     def delete(self, cron_name) -> bool:
         raise NotImplementedError
 
@@ -1,51 +1,190 @@
+import dataclasses
 import logging
-from tempfile import NamedTemporaryFile
-from typing import List, Union
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Set, Tuple, Union
 from ppycron.src.base import BaseInterface, Cron
+import re
 import subprocess
 import os
 
 logger = logging.getLogger(__name__)
 
+_READ_CMD = ("crontab", "-l")
+_WRITE_CMD = ("crontab", "-")  # reads the new table from stdin
+# how `crontab -l` reports a user without a crontab: cronie, Vixie and BSD
+# print "no crontab for <user>", busybox fails to open the spool file
+_NO_CRONTAB_MESSAGES = ("no crontab for", "No such file or directory")
+
+# an @nickname (@reboot, @daily...) or five interval fields, then the command
+_CRON_LINE = re.compile(
+    r"^\s*(@\w+|\S+\s+\S+\s+\S+\s+\S+\s+\S+)\s+(\S.*?)\s*$"
+)
+
+
+def _crontab_read() -> str:
+    """Return the user's crontab, empty when they do not have one yet."""
+    result = subprocess.run(_READ_CMD, capture_output=True, text=True)
+    if result.returncode != 0:
+        if any(message in result.stderr for message in _NO_CRONTAB_MESSAGES):
+            return ""
+        # any other failure must not look like an empty table, the next
+        # write would install it over the user's jobs
+        raise subprocess.CalledProcessError(
+            result.returncode, _READ_CMD, output=result.stdout, stderr=result.stderr
+        )
+    return result.stdout
+
+
+def _crontab_write(text: str) -> None:
+    subprocess.run(_WRITE_CMD, input=text, text=True, check=True)
+
+
+def _parse_line(line: str) -> Optional[Tuple[str, str]]:
+    """Split a crontab line into (interval, command), None if it holds no job."""
+    if line.lstrip().startswith("#"):
+        return None
+    match = _CRON_LINE.match(line)
+    # schedule fields never hold "=", environment assignments such as
+    # MAILTO="..." or PATH = ... always do
+    if match is None or "=" in match.group(1):
+        return None
+    return match.group(1), match.group(2)
+
 
 class UnixInterface(BaseInterface):
 
     operational_system = "linux"
 
-    def __init__(self):
-        with NamedTemporaryFile("w") as f:
-            f.write("# Created automatically by Pycron =)\n")
-            f.flush()
-            os.system(f"crontab {f.name}")
+    def __init__(self, bootstrap: bool = False, cache: bool = False):
+        # with cache=True, get_all() and exists() answer from the last crontab
+        # this instance read or wrote instead of running `crontab -l` again
+        self._use_cache = cache
+        self._in_batch = False
+        # crontab text built up inside bulk(), kept apart from the cache so
+        # invalidate() or a re-read can never drop uninstalled changes
+        self._pending: Optional[str] = None
+        self._cache_text: Optional[str] = None
+        self._cache_crons: Optional[List[Cron]] = None
+        self._cache_commands: Optional[Set[str]] = None
+        self._parsed_from: Optional[str] = None
+        self._cache_pid: Optional[int] = None
+        if bootstrap and not self._read():
+            # only seed users without a crontab, never overwrite existing jobs
+            self._install("# Created automatically by Pycron =)\n")
+
+    def invalidate(self) -> None:
+        """Drop the cached crontab so the next call reads it again.
+
+        Only matters with cache=True, where get_all() and exists() answer
+        from the cache: call it before them when the crontab may have been
+        changed outside of this instance, e.g. by another process or by
+        running `crontab -e`.
+        """
+        self._cache_text = None
+        self._cache_crons = None
+        self._cache_commands = None
+        self._cache_pid = None
+
+    def _store(self, text: str) -> None:
+        self._cache_text = text
+        self._cache_crons = None
+        self._cache_commands = None
+        self._cache_pid = os.getpid()
+
+    def _read(self) -> str:
+        if self._pending is not None:
+            return self._pending
+        # a forked child may outlive changes made by its parent, re-read there
+        if (
+            not self._use_cache
+            or self._cache_text is None
+            or self._cache_pid != os.getpid()
+        ):
+            self._store(_crontab_read())
+        return self._cache_text
+
+    def _snapshot(self) -> str:
+        """Return the crontab a mutation should start from.
+
+        Outside bulk() the crontab is read again, so changes made elsewhere
+        since the cache was filled are never written over. Inside it the
+        pending text, read once on the first change, is used.
+        """
+        if self._pending is not None:
+            return self._pending
+        self._store(_crontab_read())
+        return self._cache_text
+
+    def _install(self, text: str) -> None:
+        if self._in_batch:
+            # inside bulk(), nothing is written until the block exits
+            self._pending = text
+            return
+        try:
+            _crontab_write(text)
+        except subprocess.CalledProcessError:
+            self.invalidate()
+            raise
+        self._store(text)
 
     def add(self, command, interval) -> Cron:
         cron = Cron(command=command, interval=interval)
-        pipe = os.popen("crontab -l")
-        current = pipe.read()
-        current += str(cron) + "\n"
-        with NamedTemporaryFile("w") as f:
-            f.write(str(current))
-            f.flush()
-            os.system(f"crontab {f.name}")
+        self._install(self._snapshot() + str(cron) + "\n")
         return cron
 
+    @contextmanager
+    def bulk(self) -> Iterator["UnixInterface"]:
+        """Apply every add(), edit() and delete() made in the block to an
+        in-memory copy of the crontab and install it once when the block exits.
+
+        Nothing is installed if the block raises. A nested block that raises
+        only discards its own changes.
+        """
+        if self._in_batch:
+            # nested blocks join the outermost one
+            saved = self._pending
+            try:
+                yield self
+            except BaseException:
+                self._pending = saved
+                raise
+            return
+        self._in_batch = True
+        self._pending = None
+        try:
+            yield self
+            pending = self._pending
+        finally:
+            self._in_batch = False
+            self._pending = None
+        if pending is not None:
+            self._install(pending)
+
+    def _parsed(self, current: Optional[str] = None) -> List[Cron]:
+        """Return the crons in `current`, by default the crontab as _read()
+        returns it, reusing the last parse when the text is unchanged."""
+        if current is None:
+            current = self._read()
+        # inside bulk() the text changes without going through _store()
+        if self._cache_crons is None or self._parsed_from is not current:
+            crons = []
+            for line in current.splitlines():
+                parsed = _parse_line(line)
+                if parsed:
+                    interval, command = parsed
+                    crons.append(Cron(command=command, interval=interval))
+            self._cache_crons = crons
+            self._cache_commands = {cron.command for cron in crons}
+            self._parsed_from = current
+        return self._cache_crons
+
     def get_all(self) -> Union[List[Cron], List]:
-        output = subprocess.check_output(["crontab", "-l"])
-        crons = []
-        for line in output.decode("utf8").split("\n"):
-            is_comment = line.startswith("#")
-            if is_comment:
-                continue
-            interval = " ".join(
-                line.split(" ")[:5]
-            )  # get all characters between spaces until its fifth element
-            command = " ".join(
-                line.split(" ")[5:]
-            ).strip()  # join the last elements, they are the command
-            name = " ".join(line.split(" ")[-1:])  # gets the name of the crontab
-            if name:
-                crons.append(Cron(command=command, interval=interval))
-        return crons
+        # copies, so changing a returned Cron cannot corrupt the cache
+        return [dataclasses.replace(cron) for cron in self._parsed()]
+
+    def exists(self, command) -> bool:
+        self._parsed()
+        return command in self._cache_commands
 
     def edit(self, cron_command, **kwargs) -> bool:
         class NotEnoughInformation(Exception):
@@ -58,35 +197,11 @@ class UnixInterface(BaseInterface):
         new_interval = kwargs.get("interval")
         if not all([new_interval, new_command]):
             raise NotEnoughInformation("Cannot edit without information")
-        output = subprocess.check_output(["crontab", "-l"])
-        lines = []
-        for line in output.decode("utf8").split("\n"):
-            is_comment = line.startswith("#")
-            if is_comment:
-                lines.append(line + "\n")
-                continue
-            interval = " ".join(
-                line.split(" ")[:5]
-            )  # get all characters between spaces until its fifth element
-            command = " ".join(
-                line.split(" ")[5:]
-            ).strip()  # join the last elements, they are the command
-            # name = " ".join(line.split(" ")[-1:])  # gets the name of the crontab
-            if command == cron_command:
-                # if we find the line, we replace the contents
-                if new_interval:
-                    line = line.replace(interval, new_interval)
-                if new_command:
-                    line = line.replace(command, new_command)
-            lines.append(line + "\n")
-        current = ""
-        for line in lines:
-            current += line
-        with NamedTemporaryFile("w") as f:
-            f.write(str(current))
-            f.flush()
-            os.system(f"crontab {f.name}")
-        return True
+
+        def transform(interval: str, command: str) -> str:
+            return f"{new_interval or interval} {new_command or command}"
+
+        return self._rewrite(cron_command, transform)
 
     def delete(self, cron_command) -> bool:
         class NotEnoughInformation(Exception):
@@ -95,23 +210,29 @@ class UnixInterface(BaseInterface):
         if not cron_command:
             raise NotEnoughInformation("You should try pass the cron name")
 
-        output = subprocess.check_output(["crontab", "-l"])
+        return self._rewrite(cron_command, lambda interval, command: None)
+
+    def _rewrite(
+        self,
+        cron_command: str,
+        transform: Callable[[str, str], Optional[str]],
+    ) -> bool:
+        """Replace every job running `cron_command` with what `transform`
+        returns for its (interval, command), dropping it on None.
+
+        Returns False, without installing anything, if no job matched.
+        """
+        current = self._snapshot()
+        self._parsed(current)
+        if cron_command not in self._cache_commands:
+            return False
         lines = []
-        for line in output.decode("utf8").split("\n"):
-            is_comment = line.startswith("#")
-            if is_comment:
-                lines.append(line + "\n")
-                continue
-            command = " ".join(line.split(" ")[5:])  # gets the command of the crontab
-            if command == cron_command:
-                # Delete line
-                line = ""
+        for line in current.splitlines():
+            parsed = _parse_line(line)
+            if parsed and parsed[1] == cron_command:
+                line = transform(*parsed)
+                if line is None:
+                    continue
             lines.append(line + "\n")
-        current = ""
-        for line in lines:
-            current += line
-        with NamedTemporaryFile("w") as f:
-            f.write(str(current))
-            f.flush()
-            os.system(f"crontab {f.name}")
+        self._install("".join(lines))
         return True
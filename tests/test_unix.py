@@ -1,4 +1,5 @@
 import os
+import subprocess
 
 import pytest
 
@@ -14,29 +15,67 @@ def config_file():
 
 
 @pytest.fixture
-def os_system(mocker):
-    yield mocker.patch("ppycron.src.unix.os.system")
+def crontab_read(mocker, config_file):
+    data = config_file.read()
+    yield mocker.patch("ppycron.src.unix._crontab_read", return_value=data)
 
 
 @pytest.fixture
-def os_popen(mocker):
-    yield mocker.patch("ppycron.src.unix.os.popen")
+def crontab_write(mocker, crontab_read):
+    def write(text):
+        # like the real crontab, what was installed is read back next time
+        crontab_read.return_value = text
+
+    yield mocker.patch("ppycron.src.unix._crontab_write", side_effect=write)
 
 
 @pytest.fixture
-def subprocess_check_output(mocker, config_file):
-    data = bytes(config_file.read(), "utf8")
-    yield mocker.patch(
-        "ppycron.src.unix.subprocess.check_output",
-        return_value=data,
-    )
+def crontab(crontab_write):
+    from ppycron.src.unix import UnixInterface
+
+    return UnixInterface()
 
 
 @pytest.fixture
-def crontab(os_system):
+def cached_crontab(crontab_write):
     from ppycron.src.unix import UnixInterface
 
-    return UnixInterface()
+    return UnixInterface(cache=True)
+
+
+def test_init_does_not_touch_crontab(crontab_write, crontab_read):
+    from ppycron.src.unix import UnixInterface
+
+    UnixInterface()
+
+    crontab_read.assert_not_called()
+    crontab_write.assert_not_called()
+
+
+def test_bootstrap_keeps_existing_crontab(mocker, crontab_write):
+    from ppycron.src.unix import UnixInterface
+
+    crontab_read = mocker.patch(
+        "ppycron.src.unix._crontab_read",
+        return_value="*/15 0 * * * echo existing\n",
+    )
+    crontab = UnixInterface(bootstrap=True)
+
+    crontab_read.assert_called_once()
+    crontab_write.assert_not_called()
+    assert crontab.get_all() == [
+        Cron(command="echo existing", interval="*/15 0 * * *")
+    ]
+
+
+def test_bootstrap_seeds_missing_crontab(mocker, crontab_write):
+    from ppycron.src.unix import UnixInterface
+
+    mocker.patch("ppycron.src.unix._crontab_read", return_value="")
+    crontab = UnixInterface(bootstrap=True)
+
+    crontab_write.assert_called_once()
+    assert crontab.get_all() == []
 
 
 @pytest.mark.parametrize(
@@ -71,15 +110,22 @@ def crontab(os_system):
     ],
 )
 def test_add_cron(
-    crontab, config_file, cron_line, interval, command, mocker, os_system, os_popen
+    crontab,
+    config_file,
+    cron_line,
+    interval,
+    command,
+    mocker,
+    crontab_write,
+    crontab_read,
 ):
     cron = crontab.add(command=command, interval=interval)
 
     assert isinstance(cron, Cron)
     assert cron.command == command
     assert cron.interval == interval
-    os_system.assert_called()
-    os_popen.assert_called()
+    crontab_write.assert_called()
+    crontab_read.assert_called()
 
 
 @pytest.mark.parametrize(
@@ -118,28 +164,280 @@ def test_add_cron(
     ],
 )
 def test_get_cron_jobs(
-    crontab, config_file, cron_line, interval, command, mocker, subprocess_check_output
+    crontab, config_file, cron_line, interval, command, mocker, crontab_read
 ):
     crontab.get_all()
-    subprocess_check_output.assert_called()
+    crontab_read.assert_called()
 
 
-def test_edit_cron(crontab, config_file, mocker, subprocess_check_output, os_popen):
+def test_edit_cron(crontab, config_file, mocker, crontab_read, crontab_write):
     job = crontab.add(command='echo "hello"', interval="*/15 0 * * *")
     crontab.edit(
         cron_command=job.command, command="echo edited-command", interval="*/15 0 * * *"
     )
-    assert subprocess_check_output.called
-    assert os_popen.called
+    assert crontab_read.called
+    assert crontab_write.called
 
 
-def test_delete_cron(crontab, config_file, mocker, os_popen, subprocess_check_output, os_system):
+def test_delete_cron(crontab, config_file, mocker, crontab_read, crontab_write):
     crontab.add(
         command="echo job_to_be_deleted",
         interval="*/15 0 * * *",
     )
     crontab.delete(cron_command="echo job_to_be_deleted")
 
-    os_popen.assert_called()
-    subprocess_check_output.assert_called()
-    os_system.assert_called()
+    crontab_read.assert_called()
+    crontab_write.assert_called()
+
+
+def test_bulk_add_cron(crontab, crontab_read, crontab_write):
+    crontab_write.reset_mock()
+    with crontab.bulk() as bulk:
+        crons = [
+            bulk.add(command="echo first", interval="*/15 0 * * *"),
+            bulk.add(command="echo second", interval="1 2 * * *"),
+        ]
+        crontab_write.assert_not_called()
+
+    assert all(isinstance(cron, Cron) for cron in crons)
+    crontab_read.assert_called_once_with()
+    crontab_write.assert_called_once()
+
+
+def test_bulk_edit_and_delete_cron(crontab, crontab_read, crontab_write):
+    crontab_write.reset_mock()
+    with crontab.bulk() as bulk:
+        bulk.add(command="echo job_to_be_edited", interval="*/15 0 * * *")
+        bulk.add(command="echo job_to_be_deleted", interval="*/15 0 * * *")
+        bulk.edit(cron_command="echo job_to_be_edited", interval="1 2 * * *")
+        bulk.delete(cron_command="echo job_to_be_deleted")
+        crontab_write.assert_not_called()
+
+    crontab_read.assert_called_once()
+    crontab_write.assert_called_once()
+    crons = crontab.get_all()
+    assert Cron(command="echo job_to_be_edited", interval="1 2 * * *") in crons
+    assert all(cron.command != "echo job_to_be_deleted" for cron in crons)
+
+
+def test_bulk_discards_changes_on_error(crontab, crontab_write):
+    crontab_write.reset_mock()
+    with pytest.raises(RuntimeError):
+        with crontab.bulk() as bulk:
+            bulk.add(command="echo never-installed", interval="*/15 0 * * *")
+            raise RuntimeError
+
+    crontab_write.assert_not_called()
+    assert all(cron.command != "echo never-installed" for cron in crontab.get_all())
+
+
+def test_get_all_reads_crontab_every_time(crontab, crontab_read):
+    crontab.get_all()
+    crontab.get_all()
+
+    assert crontab_read.call_count == 2
+
+
+def test_get_all_reads_crontab_once(cached_crontab, crontab_read):
+    first = cached_crontab.get_all()
+    second = cached_crontab.get_all()
+
+    assert first == second
+    crontab_read.assert_called_once()
+
+    cached_crontab.invalidate()
+    cached_crontab.get_all()
+    assert crontab_read.call_count == 2
+
+
+def test_add_updates_cached_crontab(cached_crontab, crontab_read):
+    cached_crontab.add(command="echo cached", interval="*/15 0 * * *")
+    crons = cached_crontab.get_all()
+
+    assert Cron(command="echo cached", interval="*/15 0 * * *") in crons
+    crontab_read.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "stderr",
+    [
+        "no crontab for user\n",
+        "crontab: can't open 'user': No such file or directory\n",
+    ],
+)
+def test_crontab_read_without_crontab(mocker, stderr):
+    from ppycron.src.unix import _crontab_read
+
+    run = mocker.patch(
+        "ppycron.src.unix.subprocess.run",
+        return_value=subprocess.CompletedProcess(
+            ("crontab", "-l"), 1, stdout="", stderr=stderr
+        ),
+    )
+
+    assert _crontab_read() == ""
+    run.assert_called_once_with(("crontab", "-l"), capture_output=True, text=True)
+
+
+def test_crontab_read_failure_raises(mocker):
+    from ppycron.src.unix import _crontab_read
+
+    mocker.patch(
+        "ppycron.src.unix.subprocess.run",
+        return_value=subprocess.CompletedProcess(
+            ("crontab", "-l"), 1, stdout="", stderr="crontab: Permission denied\n"
+        ),
+    )
+
+    with pytest.raises(subprocess.CalledProcessError):
+        _crontab_read()
+
+
+def test_crontab_write_pipes_stdin(mocker):
+    from ppycron.src.unix import _crontab_write
+
+    run = mocker.patch("ppycron.src.unix.subprocess.run")
+    _crontab_write("*/15 0 * * * echo piped\n")
+
+    run.assert_called_once_with(
+        ("crontab", "-"), input="*/15 0 * * * echo piped\n", text=True, check=True
+    )
+
+
+def test_add_appends_cron_line(crontab, crontab_write):
+    crontab.add(command="echo piped", interval="*/15 0 * * *")
+
+    (text,) = crontab_write.call_args.args
+    assert text.endswith("*/15 0 * * * echo piped\n")
+
+
+def test_failed_install_drops_cache(cached_crontab, crontab_read, crontab_write):
+    cached_crontab.get_all()
+    crontab_write.side_effect = subprocess.CalledProcessError(1, ["crontab", "-"])
+
+    with pytest.raises(subprocess.CalledProcessError):
+        cached_crontab.add(command="echo rejected", interval="*/15 0 * * *")
+
+    cached_crontab.get_all()
+    # get_all, the re-read before add, and the re-read after the failure
+    assert crontab_read.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "line,expected",
+    [
+        ('*/15 0 * * * echo "hello"', ("*/15 0 * * *", 'echo "hello"')),
+        (
+            "1 3-4 * * 1,2  sh /path/to/file.sh ",
+            ("1 3-4 * * 1,2", "sh /path/to/file.sh"),
+        ),
+        ("# Created automatically by Pycron =)", None),
+        ("  # 1 2 * * * echo commented-out", None),
+        ("SHELL=/bin/bash", None),
+        ('MAILTO="a b c d e f"', None),
+        ("PATH = /usr/bin:/bin /sbin /opt/bin /x /y", None),
+        ("@reboot /usr/bin/run a b c d", ("@reboot", "/usr/bin/run a b c d")),
+        ("@daily  echo daily ", ("@daily", "echo daily")),
+        ("1 2 3 4 5 ", None),
+        ("", None),
+    ],
+)
+def test_parse_line(line, expected):
+    from ppycron.src.unix import _parse_line
+
+    assert _parse_line(line) == expected
+
+
+def test_edit_only_rewrites_interval(crontab, crontab_read):
+    crontab_read.return_value = "1 2 * * * echo 1 2 * * *\n"
+    crontab.edit(cron_command="echo 1 2 * * *", interval="*/10 * * * *")
+
+    assert crontab.get_all() == [
+        Cron(command="echo 1 2 * * *", interval="*/10 * * * *")
+    ]
+
+
+def test_edit_and_delete_missing_cron_do_not_install(crontab, crontab_write):
+    assert crontab.edit(cron_command="echo missing", interval="*/15 0 * * *") is False
+    assert crontab.delete(cron_command="echo missing") is False
+    crontab_write.assert_not_called()
+
+
+def test_delete_removes_line(crontab, crontab_write):
+    crontab.add(command="echo kept", interval="*/15 0 * * *")
+    crontab.add(command="echo job_to_be_deleted", interval="*/15 0 * * *")
+
+    assert crontab.delete(cron_command="echo job_to_be_deleted") is True
+    crontab_write.assert_called_with("*/15 0 * * * echo kept\n")
+
+
+def test_exists(crontab):
+    assert crontab.exists("echo indexed") is False
+
+    crontab.add(command="echo indexed", interval="*/15 0 * * *")
+    assert crontab.exists("echo indexed") is True
+
+    crontab.delete(cron_command="echo indexed")
+    assert crontab.exists("echo indexed") is False
+
+
+def test_bulk_survives_invalidate(crontab, crontab_write):
+    with crontab.bulk() as bulk:
+        bulk.add(command="echo batched", interval="*/15 0 * * *")
+        bulk.invalidate()
+        bulk.add(command="echo after-invalidate", interval="1 2 * * *")
+
+    crontab_write.assert_called_once_with(
+        "*/15 0 * * * echo batched\n1 2 * * * echo after-invalidate\n"
+    )
+
+
+def test_bulk_survives_fork(crontab, mocker, crontab_write):
+    with crontab.bulk() as bulk:
+        bulk.add(command="echo batched", interval="*/15 0 * * *")
+        mocker.patch("ppycron.src.unix.os.getpid", return_value=-1)
+        assert bulk.exists("echo batched")
+
+    crontab_write.assert_called_once_with("*/15 0 * * * echo batched\n")
+
+
+def test_nested_bulk_discards_only_inner_changes(crontab, crontab_write):
+    with crontab.bulk() as outer:
+        outer.add(command="echo outer", interval="*/15 0 * * *")
+        with pytest.raises(RuntimeError):
+            with outer.bulk() as inner:
+                inner.add(command="echo inner", interval="*/15 0 * * *")
+                raise RuntimeError
+
+    crontab_write.assert_called_once_with("*/15 0 * * * echo outer\n")
+
+
+def test_mutations_keep_changes_from_other_instances(crontab_write):
+    from ppycron.src.unix import UnixInterface
+
+    first, second = UnixInterface(), UnixInterface()
+    first.get_all()
+    second.add(command="echo from-second", interval="*/15 0 * * *")
+    first.add(command="echo from-first", interval="*/15 0 * * *")
+
+    crontab_write.assert_called_with(
+        "*/15 0 * * * echo from-second\n*/15 0 * * * echo from-first\n"
+    )
+
+
+def test_get_all_returns_copies(cached_crontab):
+    cached_crontab.add(command="echo original", interval="*/15 0 * * *")
+    cached_crontab.get_all()[0].command = "echo changed"
+
+    assert cached_crontab.get_all() == [
+        Cron(command="echo original", interval="*/15 0 * * *")
+    ]
+    assert cached_crontab.exists("echo original") is True
+
+
+def test_forked_child_reads_crontab_again(cached_crontab, mocker, crontab_read):
+    cached_crontab.get_all()
+    mocker.patch("ppycron.src.unix.os.getpid", return_value=-1)
+    cached_crontab.get_all()
+
+    assert crontab_read.call_count == 2